@@ -1,8 +1,48 @@
 # flake8: noqa
-from .queue import Queue
-from .worker_process import PostponeShutdown, worker_main, TWorker
-from .task import redis_task, get_current_task, Task
+import importlib as _importlib
+
+from . import exceptions as _exceptions
 from .exceptions import *
-from .scheduler import crontab, scheduler_main, once_per_day, run_every
 
 __version__ = '0.0.12.dev0'
+
+# The rest of the public API is imported on first access, so that e.g. the
+# command line tool does not have to load redis and the task machinery just
+# to print its help.
+_lazy_attributes = {
+    'Queue': '.queue',
+    'PostponeShutdown': '.worker_process',
+    'worker_main': '.worker_process',
+    'TWorker': '.worker_process',
+    'redis_task': '.task',
+    'get_current_task': '.task',
+    'Task': '.task',
+    'crontab': '.scheduler',
+    'scheduler_main': '.scheduler',
+    'once_per_day': '.scheduler',
+    'run_every': '.scheduler',
+}
+
+__all__ = [
+    *(name for name in dir(_exceptions) if not name.startswith('_')),
+    *_lazy_attributes,
+]
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        # Submodules like redis_tasks.conf stay reachable after a plain import
+        try:
+            return _importlib.import_module('.' + name, __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f'{__name__}.{name}':
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = _importlib.import_module(_lazy_attributes[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -4,15 +4,14 @@ import math
 import shutil
 import sys
 import time
-from functools import partial
+from functools import partial, reduce
 from operator import attrgetter
 
 import click
-from redis.exceptions import ConnectionError
 
-from redis_tasks import __version__, scheduler_main, worker_main
-from redis_tasks.queue import Queue
-from redis_tasks.worker import Worker, WorkerState
+# Only import the lightweight parts of redis_tasks here. The commands import
+# what they need themselves to keep the startup time of the tool low.
+from redis_tasks import __version__
 
 red = partial(click.style, fg='red')
 green = partial(click.style, fg='green')
@@ -35,6 +34,7 @@ def main(pythonpath):
 @click.argument('queues', nargs=-1)
 def empty(all, delete, queues, **options):
     """Empty selected queues"""
+    from redis_tasks.queue import Queue
 
     if all:
         queues = Queue.all()
@@ -47,12 +47,19 @@ def empty(all, delete, queues, **options):
         click.echo('Nothing to do')
         sys.exit(0)
 
+    Queue.empty_many(queues, delete=delete)
     for queue in queues:
-        if delete:
-            queue.delete()
-        else:
-            queue.empty()
-        click.echo(f'Queue f{queue.name} emptied')
+        click.echo(f'Queue {queue.name} emptied')
+
+
+logging_options = [
+    click.option('--verbose', '-v', is_flag=True, help='Show more output'),
+    click.option('--quiet', '-q', is_flag=True, help='Show less output'),
+]
+
+
+def with_logging_options(func):
+    return reduce(lambda f, option: option(f), reversed(logging_options), func)
 
 
 def configure_logging(verbose, quiet, **options):
@@ -65,10 +72,12 @@ def configure_logging(verbose, quiet, **options):
 
 
 @main.command()
-@click.option('--verbose', '-v', is_flag=True, help='Show more output')
-@click.option('--quiet', '-q', is_flag=True, help='Show less output')
+@with_logging_options
 def scheduler(**options):
     """Run the redis_tasks scheduler"""
+    from redis.exceptions import ConnectionError
+
+    from redis_tasks import scheduler_main
     configure_logging(**options)
     try:
         scheduler_main()
@@ -80,11 +89,13 @@ def scheduler(**options):
 @main.command()
 @click.option('--burst', '-b', is_flag=True, help='Run in burst mode (quit after all work is done)')
 @click.option('--description', '-d', help='Specify a different description')
-@click.option('--verbose', '-v', is_flag=True, help='Show more output')
-@click.option('--quiet', '-q', is_flag=True, help='Show less output')
+@with_logging_options
 @click.argument('queues', nargs=-1)
 def worker(burst, description, queues, **options):
     """Run a redis_tasks worker"""
+    from redis.exceptions import ConnectionError
+
+    from redis_tasks import worker_main
     configure_logging(**options)
     queues = queues or ['default']
     try:
@@ -100,6 +111,9 @@ def worker(burst, description, queues, **options):
 @click.argument('queues', nargs=-1)
 def info(interval, by_queue, queues, **options):
     """Display information about active queues and workers"""
+    from redis.exceptions import ConnectionError
+
+    from redis_tasks.queue import Queue
     if queues:
         queues = [Queue(q) for q in queues]
 
@@ -130,6 +144,7 @@ def print_separator():
 
 
 def show_queues(queues):
+    from redis_tasks.queue import Queue
     if not queues:
         queues = Queue.all()
 
@@ -153,6 +168,9 @@ def show_queues(queues):
 
 
 def show_workers(queues, by_queue):
+    from redis_tasks.queue import Queue
+    from redis_tasks.worker import Worker, WorkerState
+
     def state_symbol(state):
         return {
             WorkerState.BUSY: red('busy'),
@@ -95,7 +95,31 @@ class RTPipeline(redis.client.Pipeline, RTRedis):
 
 @LazyObject
 def connection():
-    return RTRedis.from_url(settings.REDIS_URL)
+    # All users of the connection share one pool, which blocks instead of
+    # failing when all connections are checked out.
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL)
+    return RTRedis(connection_pool=pool)
+
+
+class LuaScript:
+    """A lua script that is registered with the connection on first use."""
+
+    def __init__(self, script):
+        self.script = script
+        self._registered = None
+
+    def __call__(self, keys=[], args=[], client=None):
+        if self._registered is None:
+            self._registered = connection.register_script(self.script)
+        if client is None:
+            # Use the proxy rather than the client the script was registered
+            # with, so that a replaced connection also applies to scripts.
+            client = connection
+        return self._registered(keys=keys, args=args, client=client)
 
 
 @LazyObject
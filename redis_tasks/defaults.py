@@ -7,6 +7,9 @@ MAINTENANCE_FREQ = 60 * 1  # 1 minute
 
 REDIS_URL = "redis://127.0.0.1:6379"
 REDIS_PREFIX = "redis_tasks"
+REDIS_MAX_CONNECTIONS = 50
+REDIS_POOL_TIMEOUT = 20  # 20 seconds
+REDIS_HEALTH_CHECK_INTERVAL = 30  # 30 seconds
 MIDDLEWARE = []
 WORKER_PRELOAD_FUNCTION = None
 WORKER_DESCRIPTION_FUNCTION = "redis_tasks.worker_process.generate_worker_description"
@@ -1,11 +1,21 @@
-from .conf import connection, construct_redis_key
+from .conf import LuaScript, connection, construct_redis_key
 from .exceptions import TaskDoesNotExist
 from .registries import queue_registry
 from .task import Task
 from .utils import atomic_pipeline, decode_list
 
+# Use lua script to atomically clear unblock_key if queue is empty
+dequeue_script = LuaScript("""
+    local queue, unblocker, worker_task_list = unpack(KEYS)
+    local result = redis.call("RPOPLPUSH", queue, worker_task_list)
+    if result == false then
+        redis.call("DEL", unblocker)
+    end
+    return result
+""")
 
-class Queue(object):
+
+class Queue:
     def __init__(self, name='default'):
         self.name = name
         self.key = construct_redis_key('queue:' + name)
@@ -22,22 +32,27 @@ class Queue(object):
     def count(self):
         return connection.llen(self.key)
 
-    def _empty_transaction(self, pipeline):
-        task_ids = decode_list(pipeline.lrange(self.key, 0, -1))
-        pipeline.multi()
-        Task.delete_many(task_ids, pipeline=pipeline)
-        pipeline.delete(self.key)
-        pipeline.delete(self.unblock_key)
+    @classmethod
+    def empty_many(cls, queues, *, delete=False):
+        """Removes all messages on the queues in a single transaction.
+
+        `delete` also removes the queues from the queue registry."""
+        def transaction(pipeline):
+            task_ids = [decode_list(pipeline.lrange(queue.key, 0, -1)) for queue in queues]
+            pipeline.multi()
+            for queue, queue_task_ids in zip(queues, task_ids):
+                Task.delete_many(queue_task_ids, pipeline=pipeline)
+                pipeline.delete(queue.key, queue.unblock_key)
+                if delete:
+                    queue_registry.remove(queue, pipeline=pipeline)
+        connection.transaction(transaction, *(queue.key for queue in queues))
 
     def empty(self):
         """Removes all messages on the queue."""
-        connection.transaction(self._empty_transaction, self.key)
+        self.empty_many([self])
 
     def delete(self):
-        def transaction(pipeline):
-            self._empty_transaction(pipeline)
-            queue_registry.remove(self, pipeline=pipeline)
-        connection.transaction(transaction, self.key)
+        self.empty_many([self], delete=True)
 
     def get_task_ids(self, offset=0, length=-1):
         end = -1 - offset
@@ -81,16 +96,7 @@ class Queue(object):
 
     def dequeue(self, worker):
         """Dequeue a task and set it as the current task for `worker`"""
-        # Use lua script to atomically clear unblock_key if queue is empty
-        lua = connection.register_script("""
-            local queue, unblocker, worker_task_list = unpack(KEYS)
-            local result = redis.call("RPOPLPUSH", queue, worker_task_list)
-            if result == false then
-                redis.call("DEL", unblocker)
-            end
-            return result
-        """)
-        result = lua(keys=[self.key, self.unblock_key, worker.task_key])
+        result = dequeue_script(keys=[self.key, self.unblock_key, worker.task_key])
         if result is None:
             return None
         else:
@@ -1,13 +1,34 @@
-import redis_tasks
+import logging
 
-from .conf import connection, construct_redis_key, settings
+from .conf import LuaScript, connection, construct_redis_key, settings
 from .exceptions import WorkerDoesNotExist
 from .utils import LazyObject, atomic_pipeline, decode_list
 
+logger = logging.getLogger(__name__)
+
+# Removes the expired entries of a registry. Returns the timestamp of the
+# oldest remaining entry and the ids of the removed tasks, whose keys are
+# deleted by the caller.
+expire_script = LuaScript("""
+    local key, cutoff_time = KEYS[1], ARGV[1]
+    local task_ids = redis.call("ZRANGEBYSCORE", key, 0, cutoff_time)
+    if #task_ids > 0 then
+        redis.call("ZREMRANGEBYSCORE", key, 0, cutoff_time)
+    end
+    local oldest = redis.call("ZRANGE", key, 0, 0, "WITHSCORES")[2] or false
+    return {oldest, task_ids}
+""")
+
 
 class ExpiringRegistry:
     def __init__(self, name):
         self.key = construct_redis_key(name + '_tasks')
+        # Entries are always added with the current time, so nothing in the
+        # registry can be older than its oldest entry at the last expiration.
+        # If the clock of the redis server jumps backwards, e.g. on a failover
+        # to a host whose clock is behind, expiration is delayed by the size
+        # of the jump, as this process still waits for the old watermark.
+        self.oldest_timestamp = 0
 
     @atomic_pipeline
     def add(self, task, *, pipeline):
@@ -19,33 +40,46 @@ class ExpiringRegistry:
         return decode_list(connection.zrange(self.key, offset, end))
 
     def get_tasks(self, offset=0, length=-1):
-        return redis_tasks.task.Task.fetch_many(
-            self.get_task_ids(offset, length))
+        from redis_tasks.task import Task
+        return Task.fetch_many(self.get_task_ids(offset, length))
 
     def empty(self):  # TODO: test
+        from redis_tasks.task import Task
+
         def transaction(pipeline):
             task_ids = decode_list(pipeline.zrange(self.key, 0, -1))
             pipeline.multi()
             pipeline.delete(self.key)
-            redis_tasks.task.Task.delete_many(task_ids, pipeline=pipeline)
+            Task.delete_many(task_ids, pipeline=pipeline)
         connection.transaction(transaction, self.key)
 
     def count(self):
         return connection.zcard(self.key)
 
-    def expire(self):
+    def expire(self, *, now=None):
         """Remove expired tasks from registry."""
-        timestamp = connection.ftime()
+        if now is None:
+            now = connection.ftime()
+        if self.expiration_due(now):
+            self._expired(now, self._run_expire(now))
+
+    def expiration_due(self, timestamp):
+        """Whether any entries could have expired at `timestamp`"""
+        return timestamp - settings.EXPIRING_REGISTRIES_TTL >= self.oldest_timestamp
+
+    def _run_expire(self, timestamp, client=None):
         cutoff_time = timestamp - settings.EXPIRING_REGISTRIES_TTL
+        return expire_script(keys=[self.key], args=[cutoff_time], client=client)
 
-        def transaction(pipeline):
-            expired_task_ids = decode_list(pipeline.zrangebyscore(
-                self.key, 0, cutoff_time))
-            if expired_task_ids:
-                pipeline.multi()
-                pipeline.zremrangebyscore(self.key, 0, cutoff_time)
-                redis_tasks.task.Task.delete_many(expired_task_ids, pipeline=pipeline)
-        connection.transaction(transaction, self.key)
+    def _expired(self, timestamp, result):
+        from redis_tasks.task import Task
+        oldest, task_ids = result
+        # Without a transaction, redis can serve other clients between the
+        # chunks that delete_many splits the deletion into.
+        with connection.pipeline(transaction=False) as pipeline:
+            Task.delete_many(decode_list(task_ids), pipeline=pipeline)
+            pipeline.execute()
+        self.oldest_timestamp = float(oldest) if oldest is not None else timestamp
 
 
 finished_task_registry = LazyObject(lambda: ExpiringRegistry('finished'))
@@ -53,14 +87,48 @@ failed_task_registry = LazyObject(lambda: ExpiringRegistry('failed'))
 
 
 def registry_maintenance():
-    finished_task_registry.expire()
-    failed_task_registry.expire()
-    worker_registry.handle_died_workers()
+    # Use the same timestamp for all registries and send the expiration of the
+    # task registries and the lookup of dead workers in a single pipeline.
+    now = connection.ftime()
+    expiring = [registry for registry in [finished_task_registry, failed_task_registry]
+                if registry.expiration_due(now)]
+    with connection.pipeline() as pipeline:
+        for registry in expiring:
+            registry._run_expire(now, client=pipeline)
+        worker_registry._query_dead_ids(now, client=pipeline)
+        *expire_results, dead_worker_ids = pipeline.execute()
+
+    for registry, result in zip(expiring, expire_results):
+        registry._expired(now, result)
+    worker_registry.handle_died_workers(decode_list(dead_worker_ids), now=now)
+
+
+# Updates the timestamp of an existing worker to the current server time.
+# Returns 0 if the worker is not in the registry.
+heartbeat_script = LuaScript("""
+    redis.replicate_commands()
+    local time = redis.call("TIME")
+    local timestamp = tonumber(time[1]) + tonumber(time[2]) * 1e-6
+    return redis.call("ZADD", KEYS[1], "XX", "CH", timestamp, ARGV[1])
+""")
+
+
+# Removes a worker from the registry, unless it sent a heartbeat after
+# `oldest_valid`. Returns the number of removed entries.
+remove_dead_script = LuaScript("""
+    local key, worker_id, oldest_valid = KEYS[1], ARGV[1], tonumber(ARGV[2])
+    local score = redis.call("ZSCORE", key, worker_id)
+    if score and tonumber(score) <= oldest_valid then
+        return redis.call("ZREM", key, worker_id)
+    end
+    return 0
+""")
 
 
 class WorkerRegistry:
     def __init__(self):
         self.key = construct_redis_key('workers')
+        self.task_key_prefix = construct_redis_key('worker_task:')
 
     @atomic_pipeline
     def add(self, worker, *, pipeline):
@@ -68,50 +136,71 @@ class WorkerRegistry:
         pipeline.zadd(self.key, {worker.id: timestamp})
 
     def heartbeat(self, worker):
-        timestamp = connection.ftime()
-        updated = connection.zadd(self.key, {worker.id: timestamp}, xx=True, ch=True)
-        if not updated:
+        if not heartbeat_script(keys=[self.key], args=[worker.id]):
             raise WorkerDoesNotExist()
 
     @atomic_pipeline
-    def remove(self, worker, *, pipeline):
-        pipeline.zrem(self.key, worker.id)
+    def remove(self, worker, *, pipeline, oldest_valid=None):
+        """Removes the worker from the registry
+
+        If `oldest_valid` is given, the worker is only removed if it did not
+        send a heartbeat after that timestamp."""
+        if oldest_valid is None:
+            pipeline.zrem(self.key, worker.id)
+        else:
+            remove_dead_script(keys=[self.key], args=[worker.id, oldest_valid],
+                               client=pipeline)
 
     def get_worker_ids(self):
-        return decode_list(connection.zrangebyscore(
-            self.key, '-inf', '+inf'))
+        return decode_list(connection.zrange(self.key, 0, -1))
 
     def get_running_tasks(self):
         """Returns a worker_id -> task_id dict"""
-        task_key_prefix = construct_redis_key('worker_task:')
-        lua = connection.register_script("""
-            local workers_key, task_key_prefix = unpack(KEYS)
-            local worker_ids = redis.call("ZRANGE", workers_key, 0, -1)
-            local out = {}
-            for _, worker_id in ipairs(worker_ids) do
-                local task_key = task_key_prefix .. worker_id
-                local task_id = redis.call("LINDEX", task_key, 0)
-                if task_id ~= false then
-                    table.insert(out, worker_id)
-                    table.insert(out, task_id)
-                end
-            end
-            return out
-        """)
-        it = iter(decode_list(lua(keys=[self.key, task_key_prefix])))
-        return dict(zip(it, it))
-
-    def handle_died_workers(self):  # TODO: Test
+        worker_ids = self.get_worker_ids()
+        running_tasks = {}
+        # Without a transaction, redis can serve other clients between the
+        # commands. The chunks limit the size of each pipeline.
+        for i in range(0, len(worker_ids), 500):
+            chunk = worker_ids[i:i + 500]
+            with connection.pipeline(transaction=False) as pipeline:
+                for worker_id in chunk:
+                    pipeline.lindex(self.task_key_prefix + worker_id, 0)
+                task_ids = pipeline.execute()
+            running_tasks.update((worker_id, task_id.decode())
+                                 for worker_id, task_id in zip(chunk, task_ids)
+                                 if task_id is not None)
+        return running_tasks
+
+    def handle_died_workers(self, died_worker_ids=None, *, now=None):
+        """Marks the dead workers as died and takes care of their tasks"""
         from redis_tasks.worker import Worker
-        died_worker_ids = self.get_dead_ids()
-        for worker_id in died_worker_ids:
-            worker = Worker.fetch(worker_id)
-            worker.died()
-
-    def get_dead_ids(self):
-        oldest_valid = connection.ftime() - settings.WORKER_HEARTBEAT_TIMEOUT
-        return decode_list(connection.zrangebyscore(
-            self.key, '-inf', oldest_valid))
+        if now is None:
+            now = connection.ftime()
+        if died_worker_ids is None:
+            died_worker_ids = self.get_dead_ids(now=now)
+        if not died_worker_ids:
+            return
+        died_workers = Worker.fetch_many(died_worker_ids, skip_missing=True)
+        ghost_ids = set(died_worker_ids) - {worker.id for worker in died_workers}
+        # The registry entries are only removed if the workers are still dead
+        # when the transaction runs.
+        oldest_valid = now - settings.WORKER_HEARTBEAT_TIMEOUT
+        with connection.pipeline() as pipeline:
+            for worker_id in ghost_ids:
+                logger.warning(f'Removing worker {worker_id} without data from the registry')
+                pipeline.zrem(self.key, worker_id)
+            for worker in died_workers:
+                worker.died(pipeline=pipeline, oldest_valid=oldest_valid)
+            pipeline.execute()
+
+    def get_dead_ids(self, *, now=None):
+        if now is None:
+            now = connection.ftime()
+        return decode_list(self._query_dead_ids(now, client=connection))
+
+    def _query_dead_ids(self, timestamp, client):
+        oldest_valid = timestamp - settings.WORKER_HEARTBEAT_TIMEOUT
+        return client.zrangebyscore(self.key, '-inf', oldest_valid)
 
 
 worker_registry = LazyObject(WorkerRegistry)
@@ -188,7 +188,7 @@ def scheduler_main():
     Scheduler().run()
 
 
-class Mutex(object):
+class Mutex:
     expire_script = None
 
     def __init__(self, *, timeout):
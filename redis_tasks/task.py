@@ -253,8 +253,10 @@ class Task:
     @classmethod
     @atomic_pipeline
     def delete_many(cls, task_ids, *, pipeline):
-        if task_ids:
-            pipeline.delete(*(cls.key_for(task_id) for task_id in task_ids))
+        # Each DEL blocks redis until all its keys are freed, so large numbers
+        # of tasks are deleted in chunks.
+        for i in range(0, len(task_ids), 1000):
+            pipeline.delete(*(cls.key_for(task_id) for task_id in task_ids[i:i + 1000]))
 
     @classmethod
     def fetch_many(cls, task_ids):
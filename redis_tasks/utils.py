@@ -2,14 +2,19 @@ import datetime
 import importlib
 import operator
 import pickle
-from functools import wraps
+from functools import lru_cache, wraps
 
 from .exceptions import DeserializationError
 
+# import_module is comparatively slow even for modules that are already
+# loaded, so remember the modules we have looked up. The attribute itself is
+# not cached, so that changes to it are still picked up.
+_import_module = lru_cache(maxsize=None)(importlib.import_module)
+
 
 def import_attribute(name):
     module_name, attribute = name.rsplit('.', 1)
-    module = importlib.import_module(module_name)
+    module = _import_module(module_name)
     return getattr(module, attribute)
 
 
@@ -36,7 +41,7 @@ def utcparse(string):
 
 def enum(name, *sequential, **named):
     values = dict(zip(sequential, range(len(sequential))), **named)
-    return type(str(name), (), values)
+    return type(name, (), values)
 
 
 def one(iterable):
@@ -54,7 +59,7 @@ def one(iterable):
 
 
 def decode_list(lst):
-    return [x.decode() for x in lst]
+    return list(map(bytes.decode, lst))
 
 
 def decode_dict(dct):
@@ -21,21 +21,49 @@ WorkerState = enum(
 class Worker:
     @classmethod
     def all(cls):
-        return list(sorted((cls.fetch(id) for id in worker_registry.get_worker_ids()),
+        return list(sorted(cls.fetch_many(worker_registry.get_worker_ids()),
                            key=attrgetter('description')))
 
     @classmethod
     def fetch(cls, id):
         return cls(fetch_id=id)
 
+    @classmethod
+    def fetch_many(cls, worker_ids, *, skip_missing=False):
+        """Fetches the workers in one pipeline
+
+        Workers that do not exist are left out if `skip_missing` is set"""
+        with connection.pipeline(transaction=False) as pipeline:
+            for worker_id in worker_ids:
+                pipeline.hgetall(cls.key_for(worker_id))
+                pipeline.lrange(cls.task_key_for(worker_id), 0, -1)
+            results = pipeline.execute()
+        it = iter(results)
+        workers = []
+        for worker_id, data in zip(worker_ids, zip(it, it)):
+            try:
+                workers.append(cls(fetch_id=worker_id, fetch_data=data))
+            except WorkerDoesNotExist:
+                if not skip_missing:
+                    raise
+        return workers
+
+    @classmethod
+    def key_for(cls, worker_id):
+        return construct_redis_key('worker:' + worker_id)
+
+    @classmethod
+    def task_key_for(cls, worker_id):
+        return construct_redis_key('worker_task:' + worker_id)
+
     def __init__(self, id=None, *, description=None, queues=None,
-                 fetch_id=None):
+                 fetch_id=None, fetch_data=None):
         self.id = id or fetch_id
-        self.key = construct_redis_key('worker:' + self.id)
-        self.task_key = construct_redis_key('worker_task:' + self.id)
+        self.key = self.key_for(self.id)
+        self.task_key = self.task_key_for(self.id)
 
         if fetch_id:
-            self.refresh()
+            self.refresh(data=fetch_data)
             return
 
         self.description = description or f"Worker {id}"
@@ -47,11 +75,13 @@ class Worker:
         self.started_at = None
         self.shutdown_at = None
 
-    def refresh(self):
-        with connection.pipeline() as pipeline:
-            pipeline.hgetall(self.key)
-            pipeline.lrange(self.task_key, 0, -1)
-            obj, task_id = pipeline.execute()
+    def refresh(self, data=None):
+        if not data:
+            with connection.pipeline() as pipeline:
+                pipeline.hgetall(self.key)
+                pipeline.lrange(self.task_key, 0, -1)
+                data = pipeline.execute()
+        obj, task_id = data
 
         if not obj:
             raise WorkerDoesNotExist(self.id)
@@ -139,9 +169,12 @@ class Worker:
         pipeline.expire(self.key, settings.DEAD_WORKER_TTL)
 
     @atomic_pipeline
-    def died(self, *, pipeline):
+    def died(self, *, pipeline, oldest_valid=None):
+        """Marks the worker as dead and takes care of its task
+
+        `oldest_valid` is passed on to `WorkerRegistry.remove`."""
         logger.warning(f'Worker {self.description} [{self.id}] died')
-        worker_registry.remove(self, pipeline=pipeline)
+        worker_registry.remove(self, pipeline=pipeline, oldest_valid=oldest_valid)
         self.shutdown_at = utcnow()
         if self.current_task_id:
             task = Task.fetch(self.current_task_id)
@@ -33,10 +33,13 @@ setup(
     zip_safe=False,
     platforms='any',
     python_requires='>=3.7',
-    install_requires=['redis >=3.2.0',
+    install_requires=['redis >=3.3.0',
                       'click',
                       'croniter >=0.3.23',
                       'pytz'],
+    extras_require={
+        'hiredis': ['redis[hiredis]'],
+    },
     entry_points={
         'console_scripts': [
             'redis_tasks = redis_tasks.cli:main',
@@ -69,6 +69,18 @@ def clear_redis():
     yield
 
 
+@pytest.fixture(autouse=True, scope="function")
+def reset_registry_watermarks():
+    """Forget the expiration state that the registry singletons keep between calls"""
+    from redis_tasks import registries
+    from redis_tasks.utils import empty
+    for registry in [registries.finished_task_registry, registries.failed_task_registry]:
+        # Do not set up the registries before a test could change the settings
+        if registry._wrapped is not empty:
+            registry.oldest_timestamp = 0
+    yield
+
+
 def do_clear_redis():
     from redis_tasks import conf
     with conf.connection.pipeline() as pipeline:
@@ -86,20 +98,40 @@ def connection():
 class AtomicRedis:
     def __init__(self, wrap, exceptions):
         self.wrapped = wrap
-        self.exceptions = exceptions + ['ftime']
+        # Registering a Lua script does not talk to the server
+        self.exceptions = exceptions + ['ftime', 'register_script']
         self._atomic_counter = 0
+        # A script that is unknown to the server gets loaded, and the evalsha
+        # that failed with NoScriptError is retried once.
+        self._script_retry = None
 
     def __getattr__(self, name):
         __tracebackhide__ = True
         if name in self.exceptions:
             return getattr(self.wrapped, name)
-        if name not in ["pipeline", "transaction", "register_script"]:
+        if name == 'script_load' and self._script_retry == 'load':
+            self._script_retry = 'evalsha'
+            return getattr(self.wrapped, name)
+        if name == 'evalsha' and self._script_retry == 'evalsha':
+            self._script_retry = None
+            return getattr(self.wrapped, name)
+        if name not in ["pipeline", "transaction", "evalsha"]:
             raise Exception(f"Attempted call to connection.{name} in assert_atomic")
         if self._atomic_counter > 0:
             raise Exception("Second call to connection function in assert_atomic")
         self._atomic_counter += 1
+        if name == 'evalsha':
+            return self._evalsha
         return getattr(self.wrapped, name)
 
+    def _evalsha(self, *args):
+        from redis.exceptions import NoScriptError
+        try:
+            return self.wrapped.evalsha(*args)
+        except NoScriptError:
+            self._script_retry = 'load'
+            raise
+
 
 @pytest.fixture(scope="function")
 def assert_atomic(mocker):
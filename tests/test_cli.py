@@ -29,7 +29,8 @@ def test_empty(cli_run, stub):
 
     assert all(q.count() == 1 for q in queues)
 
-    cli_run('empty', queues[0].name, queues[1].name)
+    result = cli_run('empty', queues[0].name, queues[1].name)
+    assert result.output == f'Queue {queues[0].name} emptied\nQueue {queues[1].name} emptied\n'
     assert queues[0].count() == 0
     assert queues[1].count() == 0
     assert queues[2].count() == 1
@@ -43,7 +44,7 @@ def test_empty(cli_run, stub):
 
 
 def test_worker(cli_run, mocker):
-    worker_main = mocker.patch('redis_tasks.cli.worker_main')
+    worker_main = mocker.patch('redis_tasks.worker_main')
     log_config = mocker.patch('logging.basicConfig')
     cli_run('worker')
     worker_main.assert_called_once_with(['default'], burst=False, description=None)
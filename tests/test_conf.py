@@ -1,6 +1,9 @@
 import os
 from types import SimpleNamespace
 
+import pytest
+import redis
+
 from redis_tasks import conf, defaults
 
 
@@ -31,3 +34,34 @@ def test_mock_settings_after(settings):
 def test_construct_redis_key(settings):
     settings.REDIS_PREFIX = "bar"
     assert conf.construct_redis_key("foo") == "bar:foo"
+
+
+def test_connection_pool(connection):
+    pool = connection.connection_pool
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == conf.settings.REDIS_MAX_CONNECTIONS
+    assert pool.timeout == conf.settings.REDIS_POOL_TIMEOUT
+    assert connection.ping()
+
+
+def test_lua_script(connection, assert_atomic):
+    script = conf.LuaScript("return ARGV[1]")
+    # The script is loaded on the first call
+    connection.script_flush()
+    with assert_atomic():
+        assert script(args=['foo']) == b'foo'
+
+    with pytest.raises(Exception, match="Second call"):
+        with assert_atomic():
+            script(args=['foo'])
+            script(args=['bar'])
+
+    # Only the retry of a failed evalsha is allowed after loading a script
+    with pytest.raises(Exception, match="Attempted call to connection.script_load"):
+        with assert_atomic():
+            script(args=['foo'])
+            connection.script_load("return 1")
+
+    with connection.pipeline() as pipe:
+        script(args=['foo'], client=pipe)
+        assert pipe.execute() == [b'foo']
@@ -7,7 +7,7 @@ from redis_tasks.exceptions import TaskDoesNotExist
 from redis_tasks.queue import Queue
 from redis_tasks.registries import queue_registry
 from redis_tasks.task import Task
-from tests.utils import TaskFactory, WorkerFactory, id_list
+from tests.utils import QueueFactory, TaskFactory, WorkerFactory, id_list
 
 
 def test_queue_basics(assert_atomic):
@@ -142,6 +142,29 @@ class TestEmptyAndDelete:
         assert not connection.exists(task1.key)
         assert not connection.exists(task2.key)
 
+    def test_empty_many(self, assert_atomic, connection):
+        queues = [QueueFactory() for i in range(3)]
+        tasks = [q.enqueue_call() for q in queues for i in range(2)]
+        with assert_atomic():
+            Queue.empty_many(queues[:2])
+        assert [q.count() for q in queues] == [0, 0, 2]
+        assert not connection.exists(*(t.key for t in tasks[:4]))
+        assert connection.exists(*(t.key for t in tasks[4:])) == 2
+        assert set(queue_registry.get_names()) == {q.name for q in queues}
+
+        Queue.empty_many(queues[1:], delete=True)
+        assert queue_registry.get_names() == [queues[0].name]
+        assert not connection.exists(*(t.key for t in tasks))
+
+    def test_empty_large_queue(self, connection):
+        q = Queue()
+        with connection.pipeline() as pipeline:
+            tasks = [q.enqueue_call(pipeline=pipeline) for i in range(2500)]
+            pipeline.execute()
+        q.empty()
+        assert q.count() == 0
+        assert not connection.exists(*(t.key for t in tasks))
+
 
 def test_dequeue(connection):
     worker = WorkerFactory()
@@ -1,18 +1,22 @@
+import time
+
 import pytest
 
 from redis_tasks import registries
 from redis_tasks.conf import construct_redis_key
 from redis_tasks.exceptions import WorkerDoesNotExist
 from redis_tasks.task import TaskOutcome
-from tests.utils import QueueFactory, Something, TaskFactory, WorkerFactory
+from redis_tasks.worker import WorkerState
+from tests.utils import QueueFactory, TaskFactory, WorkerFactory
 
 
 def test_expiring_registry(connection, settings, mocker, assert_atomic):
     registry = registries.ExpiringRegistry('testexpire')
     task1 = TaskFactory()
     task2 = TaskFactory()
+    task1._save()
+    task2._save()
     settings.EXPIRING_REGISTRIES_TTL = 10
-    delete_tasks = mocker.patch('redis_tasks.task.Task.delete_many')
 
     assert registry.key == construct_redis_key('testexpire_tasks')
 
@@ -29,7 +33,60 @@ def test_expiring_registry(connection, settings, mocker, assert_atomic):
     timestamp.return_value = (1012, 0)
     registry.expire()
     assert registry.get_task_ids() == [task2.id]
-    delete_tasks.assert_called_once_with([task1.id], pipeline=Something)
+    assert not connection.exists(task1.key)
+    assert connection.exists(task2.key)
+
+
+def test_expiring_registry_skips_expire(connection, settings, mocker):
+    registry = registries.ExpiringRegistry('testexpire')
+    settings.EXPIRING_REGISTRIES_TTL = 10
+    expire_script = mocker.patch.object(
+        registries, 'expire_script', wraps=registries.expire_script)
+    timestamp = mocker.patch('redis_tasks.conf.RTRedis.time')
+
+    timestamp.return_value = (1000, 0)
+    registry.expire()
+    assert expire_script.call_count == 1
+    # Nothing can have expired until the TTL has passed since the last run
+    timestamp.return_value = (1009, 0)
+    registry.add(TaskFactory())
+    registry.expire()
+    assert expire_script.call_count == 1
+    timestamp.return_value = (1010, 0)
+    registry.expire()
+    assert expire_script.call_count == 2
+    assert registry.count() == 1
+
+    # Afterwards the oldest entry determines the next run
+    timestamp.return_value = (1018, 0)
+    registry.expire()
+    assert expire_script.call_count == 2
+    timestamp.return_value = (1019, 0)
+    registry.expire()
+    assert expire_script.call_count == 3
+    assert registry.count() == 0
+
+
+def test_expiring_registry_many(connection, settings, mocker):
+    registry = registries.ExpiringRegistry('testexpire')
+    tasks = [TaskFactory() for i in range(2500)]
+    with connection.pipeline() as pipe:
+        for task in tasks:
+            task._save(pipeline=pipe)
+        pipe.execute()
+    settings.EXPIRING_REGISTRIES_TTL = 10
+
+    timestamp = mocker.patch('redis_tasks.conf.RTRedis.time')
+    timestamp.return_value = (1000, 0)
+    with connection.pipeline() as pipe:
+        for task in tasks:
+            registry.add(task, pipeline=pipe)
+        pipe.execute()
+
+    timestamp.return_value = (1012, 0)
+    registry.expire()
+    assert registry.count() == 0
+    assert not connection.exists(*(task.key for task in tasks))
 
 
 def test_worker_registry(connection, settings, mocker, assert_atomic):
@@ -49,12 +106,16 @@ def test_worker_registry(connection, settings, mocker, assert_atomic):
     timestamp.return_value = (1120, 0)
     assert registry.get_dead_ids() == [worker1.id]
 
+    # The heartbeat takes its timestamp from the redis server, so it is not
+    # affected by the mocked time
     registry.heartbeat(worker1)
+    assert connection.zscore(registry.key, worker1.id) == pytest.approx(time.time(), abs=10)
     timestamp.return_value = (1140, 0)
     assert registry.get_dead_ids() == []
 
     timestamp.return_value = (1200, 0)
     assert registry.get_dead_ids() == [worker2.id]
+    assert registry.get_dead_ids(now=1140) == []
 
     with assert_atomic():
         registry.remove(worker1)
@@ -71,6 +132,55 @@ def test_worker_registry(connection, settings, mocker, assert_atomic):
     assert registry.get_dead_ids() == []
 
 
+def test_handle_died_workers(connection, settings, mocker):
+    registry = registries.worker_registry
+    settings.WORKER_HEARTBEAT_TIMEOUT = 100
+    queue = QueueFactory()
+    worker1 = WorkerFactory(queues=[queue])
+    worker2 = WorkerFactory(queues=[queue])
+    worker3 = WorkerFactory(queues=[queue])
+    ghost_worker = WorkerFactory(queues=[queue])
+
+    timestamp = mocker.patch('redis_tasks.conf.RTRedis.time')
+    timestamp.return_value = (1000, 0)
+    ghost_worker.startup()
+    worker1.startup()
+    worker2.startup()
+    timestamp.return_value = (1050, 0)
+    worker3.startup()
+    task = queue.enqueue_call()
+    queue.dequeue(worker2)
+    # A registry entry without worker data is removed
+    connection.delete(ghost_worker.key)
+
+    timestamp.return_value = (1120, 0)
+    registry.handle_died_workers()
+    assert registry.get_worker_ids() == [worker3.id]
+    for worker in [worker1, worker2]:
+        worker.refresh()
+        assert worker.state == WorkerState.DEAD
+        assert worker.current_task_id is None
+    # The task of the dead worker is back on the queue
+    assert queue.get_task_ids() == [task.id]
+
+
+def test_handle_died_workers_heartbeat(connection, settings, mocker):
+    registry = registries.worker_registry
+    settings.WORKER_HEARTBEAT_TIMEOUT = 100
+    worker = WorkerFactory()
+    timestamp = mocker.patch('redis_tasks.conf.RTRedis.time')
+    timestamp.return_value = (1000, 0)
+    worker.startup()
+
+    timestamp.return_value = (1120, 0)
+    dead_ids = registry.get_dead_ids()
+    assert dead_ids == [worker.id]
+    # A heartbeat after the lookup keeps the worker in the registry
+    registry.heartbeat(worker)
+    registry.handle_died_workers(dead_ids)
+    assert registry.get_worker_ids() == [worker.id]
+
+
 def test_worker_reg_running_tasks():
     registry = registries.worker_registry
     queue = QueueFactory()
@@ -112,5 +222,33 @@ def test_queue_registry(assert_atomic, connection):
     assert registry.get_names() == []
 
 
-def test_maintenance():
+def test_maintenance(connection, settings, mocker):
+    settings.EXPIRING_REGISTRIES_TTL = 10
+    settings.WORKER_HEARTBEAT_TIMEOUT = 100
+    timestamp = mocker.patch('redis_tasks.conf.RTRedis.time')
+    timestamp.return_value = (1000, 0)
+    finished_task = TaskFactory()
+    failed_task = TaskFactory()
+    registries.finished_task_registry.add(finished_task)
+    registries.failed_task_registry.add(failed_task)
+    worker = WorkerFactory()
+    worker.startup()
+
+    timestamp.reset_mock()
+    registries.registry_maintenance()
+    # All registries use the same timestamp
+    assert timestamp.call_count == 1
+    assert registries.finished_task_registry.get_task_ids() == [finished_task.id]
+    assert registries.failed_task_registry.get_task_ids() == [failed_task.id]
+    assert registries.worker_registry.get_worker_ids() == [worker.id]
+
+    timestamp.return_value = (1200, 0)
+    registries.registry_maintenance()
+    assert registries.finished_task_registry.get_task_ids() == []
+    assert registries.failed_task_registry.get_task_ids() == []
+    assert registries.worker_registry.get_worker_ids() == []
+    worker.refresh()
+    assert worker.state == WorkerState.DEAD
+
+    # Nothing to do
     registries.registry_maintenance()
@@ -3,8 +3,14 @@ import pytest
 from redis_tasks import exceptions, utils
 
 
-def test_import_attribute():
+def test_import_attribute(mocker):
     assert utils.import_attribute("tests.app.import_me.test_attrib") == "foo"
+    mocker.patch('tests.app.import_me.test_attrib', 'bar')
+    assert utils.import_attribute("tests.app.import_me.test_attrib") == "bar"
+    with pytest.raises(ImportError):
+        utils.import_attribute("tests.app.does_not_exist.test_attrib")
+    with pytest.raises(AttributeError):
+        utils.import_attribute("tests.app.import_me.does_not_exist")
 
 
 def test_utc():
@@ -12,6 +18,12 @@ def test_utc():
     assert utils.utcparse(utils.utcformat(now)) == now.replace(microsecond=0)
 
 
+def test_decode():
+    assert utils.decode_list([]) == []
+    assert utils.decode_list([b'foo', 'bär'.encode()]) == ['foo', 'bär']
+    assert utils.decode_dict({b'foo': b'bar'}) == {'foo': 'bar'}
+
+
 def test_serialization():
     my_obj = {'a': 'b', 'c': 54.325, 'd': utils.utcnow()}
     assert utils.deserialize(utils.serialize(my_obj)) == my_obj
@@ -136,6 +136,25 @@ def test_all():
     assert id_list(Worker.all()) == [w2.id]
 
 
+def test_fetch_many(connection):
+    w1 = Worker('w1', queues=[QueueFactory()])
+    w2 = Worker('w2', queues=[QueueFactory(), QueueFactory()])
+    w1.startup()
+    w2.startup()
+    w2.current_task_id = 'sometask'
+    w2._save(['current_task_id'])
+
+    assert Worker.fetch_many([]) == []
+    workers = Worker.fetch_many([w2.id, w1.id])
+    assert id_list(workers) == [w2.id, w1.id]
+    assert [w.queues for w in workers] == [w2.queues, w1.queues]
+    assert [w.current_task_id for w in workers] == ['sometask', None]
+
+    with pytest.raises(WorkerDoesNotExist):
+        Worker.fetch_many([w1.id, 'nonexist'])
+    assert id_list(Worker.fetch_many([w1.id, 'nonexist'], skip_missing=True)) == [w1.id]
+
+
 def test_heartbeat(mocker):
     heartbeat = mocker.patch.object(worker_registry, 'heartbeat')
     worker = Worker('testworker', queues=[QueueFactory()])
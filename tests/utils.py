@@ -40,7 +40,7 @@ def id_list(lst):
     return [x.id for x in lst]
 
 
-class AnythingType(object):
+class AnythingType:
     def __eq__(self, other):
         return True
 
@@ -54,7 +54,7 @@ class AnythingType(object):
 Anything = AnythingType()
 
 
-class SomethingType(object):
+class SomethingType:
     def __eq__(self, other):
         return other is not None
 